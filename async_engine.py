@@ -0,0 +1,177 @@
+# =======================
+# File: async_engine.py
+# =======================
+"""
+asyncio processing engine: an alternative to the ThreadPoolExecutor in WatchService.
+
+Watchdog callbacks hand files over with call_soon_threadsafe; each file becomes a task on
+one event loop thread. FTP I/O and retry backoff are coroutines; an ftp_connections semaphore
+bounds open FTP sessions. Workbook parsing and the CSV/XLSX logs run in a small executor.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# asyncio and the processing modules (~20 ms together) are imported inside the methods
+# that run on the loop thread, so WatchService can construct the engine and start its
+# observers without paying for them.
+
+
+class AsyncEngine:
+    def __init__(self, cpu_workers=2, ftp_connections=8, recorder=None, load_attempts=5, load_wait=1.0):
+        self.cpu_workers = cpu_workers
+        self.ftp_connections = ftp_connections
+        self.recorder = recorder
+        self.load_attempts = load_attempts
+        self.load_wait = load_wait
+        self.loop = None
+        self.thread = None
+        self.cpu_executor = ThreadPoolExecutor(max_workers=cpu_workers, thread_name_prefix="rnals-cpu")
+        self.tasks = set()
+        # files submitted before the loop is up wait here
+        self._pending = []
+        self._pending_lock = threading.Lock()
+        self._ready = threading.Event()
+
+    def start(self):
+        """Start the loop thread; doesn't wait for it, submit() buffers until it is ready."""
+        self.thread = threading.Thread(target=self._run_loop, name="rnals-async", daemon=True)
+        self.thread.start()
+
+    def _run_loop(self):
+        import asyncio
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        # semaphores/locks must be created on the loop that uses them
+        self.ftp_sem = asyncio.Semaphore(self.ftp_connections)
+        self.log_lock = asyncio.Lock()
+        with self._pending_lock:
+            self.loop = loop
+            for file_path, job_kwargs in self._pending:
+                loop.call_soon(self._spawn, file_path, job_kwargs)
+            self._pending = None
+        self._ready.set()
+        logging.info("Async engine started (cpu_workers=%d, ftp_connections=%d)",
+                     self.cpu_workers, self.ftp_connections)
+        loop.run_forever()
+        loop.close()
+
+    def submit(self, file_path, **job_kwargs):
+        """Thread-safe: called from watchdog observer threads."""
+        with self._pending_lock:
+            if self.loop is None:
+                self._pending.append((file_path, job_kwargs))
+                return
+        self.loop.call_soon_threadsafe(self._spawn, file_path, job_kwargs)
+
+    def _spawn(self, file_path, job_kwargs):
+        task = self.loop.create_task(self._run_job(file_path, job_kwargs))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def _run_job(self, file_path, job_kwargs):
+        # "started" is recorded from the job's first executor slot (see _load_workbook)
+        ok = False
+        try:
+            ok = bool(await self.process_file(file_path, **job_kwargs))
+        finally:
+            if self.recorder and self.recorder.snapshot:
+                await self._run_cpu(self.recorder.job_finished, file_path, ok)
+            elif self.recorder:
+                # no file copy to do, so don't queue the finish stamp behind other parses
+                self.recorder.job_finished(file_path, ok)
+
+    def _run_cpu(self, func, *args):
+        return self.loop.run_in_executor(self.cpu_executor, func, *args)
+
+    def _load_workbook(self, file_path, first_attempt):
+        # A task exists as soon as the file is seen, so counting it as started then would
+        # leave "queued" at ~0. Like the threaded engine, a job starts when it gets a worker.
+        from processor import safe_load_excel
+        if first_attempt and self.recorder:
+            self.recorder.job_started(file_path)
+        return safe_load_excel(file_path, 1)
+
+    async def parse_excel(self, file_path):
+        """Async counterpart of processor.parse_excel: lock retries back off without holding a thread."""
+        import asyncio
+        from processor import extract_work_order
+        for i in range(self.load_attempts):
+            try:
+                # single attempt: the backoff happens here, without holding an executor thread
+                workbook = await self._run_cpu(self._load_workbook, file_path, i == 0)
+                return await self._run_cpu(extract_work_order, workbook, file_path)
+            except PermissionError:
+                if i + 1 < self.load_attempts:
+                    logging.warning("File %s locked; retrying (%d/%d)...", file_path, i + 1, self.load_attempts)
+                    await asyncio.sleep(self.load_wait * (i + 1))
+            except FileNotFoundError:
+                logging.error(f"Error: The file at {file_path} was not found.")
+                return None
+            except Exception as e:
+                logging.error(f"An error occurred while parsing {file_path}: {e}")
+                return None
+        logging.error(f"An error occurred while parsing {file_path}: still locked after {self.load_attempts} attempts")
+        return None
+
+    async def process_file(self, file_path, ftp_config, bot_token, chat_id, watched_folder):
+        """Async counterpart of processor.process_file."""
+        from processor import prepare_upload_files
+        from ftp_utils import get_current_number_from_ftp_async, upload_files_to_ftp_async
+        from logging_utils import log_to_csv, log_to_excel
+        try:
+            excel_data = await self.parse_excel(file_path)
+            if not excel_data:
+                raise ValueError("Could not parse Excel file.")
+
+            radni_nalog = excel_data["work_order_number"]
+            datum = excel_data["datum"]
+            logging.info("Extracted RN=%s, date=%s", radni_nalog, datum)
+
+            # always override FTP remote file name to data.txt
+            ftp_config["remote_file"] = "data.txt"
+
+            # the semaphore is held per attempt inside the helpers, never across retry backoff
+            server_num = await get_current_number_from_ftp_async(ftp_config, semaphore=self.ftp_sem)
+            try:
+                broj_novi = int(str(radni_nalog).split("/")[0].strip())
+            except Exception:
+                return
+
+            # Telegram confirmation is disabled in processor.process_file as well.
+
+            # Written and read back on the loop thread with no await in between, so
+            # concurrent jobs cannot interleave on the shared temp files.
+            files_to_upload = prepare_upload_files(excel_data)
+            for file_info in files_to_upload:
+                file_info["content"] = Path(file_info["local_path"]).read_bytes()
+
+            await upload_files_to_ftp_async(ftp_config, files_to_upload, semaphore=self.ftp_sem)
+
+            # both logs rewrite shared files in the watched folder; one writer at a time
+            async with self.log_lock:
+                await self._run_cpu(log_to_csv, excel_data, watched_folder)
+                await self._run_cpu(log_to_excel, excel_data, watched_folder)
+            return True
+
+        except Exception as e:
+            logging.exception("Error processing file %s: %s", file_path, e)
+
+    async def _drain(self):
+        import asyncio
+        while self.tasks:
+            await asyncio.gather(*list(self.tasks), return_exceptions=True)
+
+    def stop(self):
+        """Wait for in-flight jobs, then stop the loop and the executor."""
+        import asyncio
+        if self.thread is None:
+            # never started, e.g. an observer failed to start first
+            self.cpu_executor.shutdown(wait=True)
+            return
+        self._ready.wait()
+        asyncio.run_coroutine_threadsafe(self._drain(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.cpu_executor.shutdown(wait=True)
@@ -0,0 +1,98 @@
+# =======================
+# File: bench_startup.py
+# =======================
+"""
+Startup benchmark: time from launching main.py to the first observed filesystem event.
+
+Each run starts main.py in a fresh temp directory watching a temp folder, keeps creating
+probe .xlsx files until the service logs "New xlsx detected", and records the elapsed time.
+
+Usage:
+    python bench_startup.py [--runs 10] [--engine threads|asyncio] [--json bench.json]
+"""
+import argparse
+import json
+import os
+import queue
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+MAIN = Path(__file__).resolve().parent / "main.py"
+DETECTED = "New xlsx detected"
+
+
+def _pump(stream, lines):
+    for line in iter(stream.readline, ""):
+        lines.put((time.perf_counter(), line))
+    stream.close()
+
+
+def measure_once(engine="threads", probe_interval=0.002, timeout=30.0):
+    with tempfile.TemporaryDirectory(prefix="rnals_bench_") as tmp:
+        work_dir = Path(tmp)
+        watched = work_dir / "watched"
+        watched.mkdir()
+        (work_dir / "config.json").write_text(json.dumps({"folders": [str(watched)]}), encoding="utf-8")
+
+        env = dict(os.environ, ENGINE=engine, PYTHONUNBUFFERED="1")
+        env.pop("TRACE_DIR", None)
+        lines = queue.Queue()
+        start = time.perf_counter()
+        proc = subprocess.Popen(
+            [sys.executable, str(MAIN)], cwd=work_dir, env=env,
+            stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+            text=True, encoding="utf-8",
+        )
+        threading.Thread(target=_pump, args=(proc.stderr, lines), daemon=True).start()
+        try:
+            probe = 0
+            while time.perf_counter() - start < timeout:
+                # a new file each time: files created before the observer is up are never reported
+                (watched / f"probe_{probe:05d}.xlsx").write_bytes(b"")
+                probe += 1
+                deadline = time.perf_counter() + probe_interval
+                while time.perf_counter() < deadline:
+                    try:
+                        seen_at, line = lines.get(timeout=probe_interval)
+                    except queue.Empty:
+                        if proc.poll() is not None:
+                            raise RuntimeError(f"main.py exited with code {proc.returncode}")
+                        continue
+                    if DETECTED in line:
+                        return seen_at - start
+            raise TimeoutError(f"No event observed within {timeout}s")
+        finally:
+            proc.kill()
+            proc.wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure time-to-first-observed-event of main.py.")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--engine", choices=("threads", "asyncio"), default="threads")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    results = []
+    for i in range(args.runs):
+        elapsed = measure_once(engine=args.engine)
+        results.append(elapsed)
+        print(f"run {i + 1:2d}: {elapsed * 1000:7.1f} ms")
+
+    summary = {
+        "engine": args.engine,
+        "runs": len(results),
+        "min_ms": min(results) * 1000,
+        "median_ms": statistics.median(results) * 1000,
+        "max_ms": max(results) * 1000,
+    }
+    print("time to first observed event: min {min_ms:.1f} ms  median {median_ms:.1f} ms  max {max_ms:.1f} ms"
+          .format(**summary))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump(dict(summary, results_ms=[r * 1000 for r in results]), fh, indent=4)
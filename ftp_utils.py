@@ -2,38 +2,43 @@
 # File: ftp_utils.py
 # =======================
 """
-FTP helpers with retries.
+FTP helpers with retries, plus asyncio variants used by the async engine.
 """
-from ftplib import FTP
+from ftplib import FTP, error_perm, error_reply, error_temp, parse227
+from contextlib import nullcontext
+import asyncio
 import time
 import logging
 from pathlib import Path
 
+def _parse_server_number(lines):
+    if lines:
+        first = lines[0].strip()
+        num = int(first.split('/')[0].lstrip("0") or "0")
+        logging.info("Current server number: %d", num)
+        return num
+    logging.warning("Remote file empty.")
+    return None
+
 def get_current_number_from_ftp(ftp_config, retries=3, wait=1.0):
     host = ftp_config.get("host")
     user = ftp_config.get("user")
     passwd = ftp_config.get("passwd")
     remote_dir = ftp_config.get("remote_dir")
     remote_file = ftp_config.get("remote_file")
+    port = ftp_config.get("port") or 21
     last_exc = None
     for attempt in range(retries):
         try:
             ftp = FTP()
-            ftp.connect(host, 21, timeout=10)
+            ftp.connect(host, port, timeout=10)
             ftp.login(user, passwd)
             if remote_dir:
                 ftp.cwd(remote_dir)
             lines = []
             ftp.retrlines(f'RETR {remote_file}', lines.append)
             ftp.quit()
-            if lines:
-                first = lines[0].strip()
-                num = int(first.split('/')[0].lstrip("0") or "0")
-                logging.info("Current server number: %d", num)
-                return num
-            else:
-                logging.warning("Remote file empty.")
-                return None
+            return _parse_server_number(lines)
         except Exception as e:
             last_exc = e
             logging.warning("FTP get failed (%d/%d): %s", attempt+1, retries, e)
@@ -46,10 +51,12 @@ def upload_files_to_ftp(ftp_config, files_to_upload, retries=3, wait=1.0):
     user = ftp_config.get("user")
     passwd = ftp_config.get("passwd")
     remote_dir = ftp_config.get("remote_dir")
+    port = ftp_config.get("port") or 21
     last_exc = None
     for attempt in range(retries):
         try:
-            ftp = FTP(host, timeout=10)
+            ftp = FTP()
+            ftp.connect(host, port, timeout=10)
             ftp.login(user, passwd)
             if remote_dir:
                 ftp.cwd(remote_dir)
@@ -67,3 +74,171 @@ def upload_files_to_ftp(ftp_config, files_to_upload, retries=3, wait=1.0):
             time.sleep(wait * (attempt+1))
     logging.error("FTP upload failed after retries: %s", last_exc)
     raise last_exc
+
+
+# --- asyncio variants ---
+
+class AsyncFTP:
+    """Minimal non-blocking FTP client (passive mode) over asyncio streams."""
+
+    def __init__(self, timeout=10):
+        self.timeout = timeout
+        self.host = None
+        self.reader = None
+        self.writer = None
+
+    async def _readline(self, reader):
+        line = await asyncio.wait_for(reader.readline(), self.timeout)
+        if not line:
+            raise EOFError("FTP connection closed")
+        return line.decode("utf-8", "replace").rstrip("\r\n")
+
+    async def getresp(self):
+        resp = await self._readline(self.reader)
+        if resp[3:4] == "-":
+            code = resp[:3]
+            line = resp
+            while not (line[:3] == code and line[3:4] != "-"):
+                line = await self._readline(self.reader)
+                resp += "\n" + line
+        if resp[:1] == "4":
+            raise error_temp(resp)
+        if resp[:1] == "5":
+            raise error_perm(resp)
+        if resp[:1] not in "123":
+            raise error_reply(resp)
+        return resp
+
+    async def sendcmd(self, cmd):
+        self.writer.write((cmd + "\r\n").encode("utf-8"))
+        await self.writer.drain()
+        return await self.getresp()
+
+    async def connect(self, host, port=21):
+        self.host = host
+        self.reader, self.writer = await asyncio.wait_for(asyncio.open_connection(host, port), self.timeout)
+        return await self.getresp()
+
+    async def login(self, user, passwd):
+        resp = await self.sendcmd(f"USER {user}")
+        if resp[0] == "3":
+            resp = await self.sendcmd(f"PASS {passwd}")
+        return resp
+
+    async def cwd(self, dirname):
+        return await self.sendcmd(f"CWD {dirname}")
+
+    async def _transfer(self, cmd):
+        # like ftplib, ignore the host in the PASV reply and reuse the control host
+        _, port = parse227(await self.sendcmd("PASV"))
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(self.host, port), self.timeout)
+        try:
+            resp = await self.sendcmd(cmd)
+            if resp[0] != "1":
+                raise error_reply(resp)
+        except BaseException:
+            writer.close()
+            raise
+        return reader, writer
+
+    async def retrlines(self, cmd):
+        await self.sendcmd("TYPE A")
+        reader, writer = await self._transfer(cmd)
+        try:
+            data = await asyncio.wait_for(reader.read(), self.timeout)
+        finally:
+            writer.close()
+        await self.getresp()
+        return data.decode("utf-8", "replace").splitlines()
+
+    async def storbinary(self, cmd, content):
+        await self.sendcmd("TYPE I")
+        reader, writer = await self._transfer(cmd)
+        try:
+            writer.write(content)
+            await writer.drain()
+            writer.close()
+            await writer.wait_closed()
+        finally:
+            writer.close()
+        return await self.getresp()
+
+    async def quit(self):
+        try:
+            return await self.sendcmd("QUIT")
+        finally:
+            self.close()
+
+    def close(self):
+        if self.writer:
+            self.writer.close()
+            self.writer = None
+
+async def get_current_number_from_ftp_async(ftp_config, retries=3, wait=1.0, semaphore=None):
+    """
+    Same as get_current_number_from_ftp. If given, semaphore is held for each attempt's
+    connect..quit only, not during the retry backoff.
+    """
+    host = ftp_config.get("host")
+    user = ftp_config.get("user")
+    passwd = ftp_config.get("passwd")
+    remote_dir = ftp_config.get("remote_dir")
+    remote_file = ftp_config.get("remote_file")
+    port = ftp_config.get("port") or 21
+    last_exc = None
+    for attempt in range(retries):
+        ftp = AsyncFTP(timeout=10)
+        try:
+            async with semaphore or nullcontext():
+                await ftp.connect(host, port)
+                await ftp.login(user, passwd)
+                if remote_dir:
+                    await ftp.cwd(remote_dir)
+                lines = await ftp.retrlines(f'RETR {remote_file}')
+                await ftp.quit()
+            return _parse_server_number(lines)
+        except Exception as e:
+            ftp.close()
+            last_exc = e
+            logging.warning("FTP get failed (%d/%d): %s", attempt+1, retries, e)
+            await asyncio.sleep(wait * (attempt+1))
+    logging.error("FTP get failed after retries: %s", last_exc)
+    return None
+
+async def upload_files_to_ftp_async(ftp_config, files_to_upload, retries=3, wait=1.0, semaphore=None):
+    """
+    Same as upload_files_to_ftp; a file_info may carry "content" bytes instead of
+    being read from "local_path" at upload time. semaphore works as in
+    get_current_number_from_ftp_async.
+    """
+    host = ftp_config.get("host")
+    user = ftp_config.get("user")
+    passwd = ftp_config.get("passwd")
+    remote_dir = ftp_config.get("remote_dir")
+    port = ftp_config.get("port") or 21
+    last_exc = None
+    for attempt in range(retries):
+        ftp = AsyncFTP(timeout=10)
+        try:
+            async with semaphore or nullcontext():
+                await ftp.connect(host, port)
+                await ftp.login(user, passwd)
+                if remote_dir:
+                    await ftp.cwd(remote_dir)
+                for file_info in files_to_upload:
+                    local_path = file_info["local_path"]
+                    remote_name = file_info["remote_name"]
+                    content = file_info.get("content")
+                    if content is None:
+                        content = Path(local_path).read_bytes()
+                    await ftp.storbinary(f"STOR {remote_name}", content)
+                    logging.info("Uploaded %s to FTP as %s/%s", local_path, remote_dir, remote_name)
+                await ftp.quit()
+            return True
+        except Exception as e:
+            ftp.close()
+            last_exc = e
+            logging.warning("FTP upload failed (%d/%d): %s", attempt+1, retries, e)
+            await asyncio.sleep(wait * (attempt+1))
+    logging.error("FTP upload failed after retries: %s", last_exc)
+    raise last_exc
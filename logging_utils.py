@@ -5,7 +5,6 @@
 Handles logging of processed work orders to CSV and XLSX files.
 """
 import csv
-import openpyxl
 import logging
 from datetime import datetime
 from pathlib import Path
@@ -72,6 +71,7 @@ def log_to_excel(data, watched_folder):
     Logs the extracted data to an XLSX file in the watched folder.
     The XLSX filename is based on the current year, and the sheet name on the current month.
     """
+    import openpyxl  # lazy, see processor.safe_load_excel
     try:
         now = datetime.now()
         year = now.year
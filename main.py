@@ -33,6 +33,8 @@ FTP_USER = os.getenv("FTP_USER")
 FTP_PASS = os.getenv("FTP_PASS")
 REMOTE_DIR = os.getenv("REMOTE_DIR")
 REMOTE_FILE = os.getenv("REMOTE_FILE")
+TRACE_DIR = os.getenv("TRACE_DIR")  # set to record a trace for replay.py
+ENGINE = os.getenv("ENGINE", "threads")  # "threads" or "asyncio"
 
 CONFIG_JSON = Path("config.json")
 
@@ -71,11 +73,6 @@ if __name__ == "__main__":
     if not folders:
         folders = prompt_and_store_folders()
 
-    invalid = validate_folders(folders)
-    if invalid:
-        print(f"These folders don't exist: {', '.join(invalid)}")
-        raise SystemExit(1)
-
     svc = WatchService(
         folders_to_watch=folders,
         bot_token=BOT_TOKEN,
@@ -84,5 +81,20 @@ if __name__ == "__main__":
             host=FTP_HOST, user=FTP_USER, passwd=FTP_PASS,
             remote_dir=REMOTE_DIR, remote_file=REMOTE_FILE
         ),
+        trace_dir=TRACE_DIR,
+        engine=ENGINE,
     )
-    svc.start()  # blocking until KeyboardInterrupt
+    # Folders are only validated if an observer fails to start, so a normal start
+    # (e.g. a scheduled-task restart) doesn't touch the shares twice before watching.
+    try:
+        svc.start_observers()
+    except OSError as e:
+        invalid = validate_folders(folders)
+        if invalid:
+            print(f"These folders don't exist: {', '.join(invalid)}")
+        else:
+            logging.error("Could not start watching: %s", e)
+        # stop any observers that did start before the failing folder
+        svc.stop()
+        raise SystemExit(1)
+    svc.serve()  # blocking until KeyboardInterrupt
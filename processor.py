@@ -7,7 +7,6 @@ save temp_number.txt, upload to FTP, log and notify.
 """
 import time
 import logging
-import openpyxl
 from datetime import datetime
 from pathlib import Path
 from ftp_utils import get_current_number_from_ftp, upload_files_to_ftp
@@ -58,6 +57,7 @@ def save_temp_number(radni_nalog, datum, path=Path("temp_number.txt")):
 
 
 def safe_load_excel(path, attempts=5, wait=1.0):
+    import openpyxl  # heavy; imported on first use or by WatchService's background preload
     last_exc = None
     for i in range(attempts):
         try:
@@ -65,8 +65,9 @@ def safe_load_excel(path, attempts=5, wait=1.0):
             return wb
         except PermissionError as e:
             last_exc = e
-            logging.warning("File %s locked; retrying (%d/%d)...", path, i + 1, attempts)
-            time.sleep(wait * (i + 1))
+            if i + 1 < attempts:
+                logging.warning("File %s locked; retrying (%d/%d)...", path, i + 1, attempts)
+                time.sleep(wait * (i + 1))
         except Exception as e:
             last_exc = e
             logging.exception("Error loading workbook %s", e)
@@ -80,63 +81,7 @@ def parse_excel(file_path):
     """
     try:
         workbook = safe_load_excel(file_path)
-        sheet = workbook.active
-
-        # Extract all the required data
-        work_order_number = sheet["C6"].value
-        partner = sheet["B7"].value
-        aparat = sheet["B12"].value
-        serijski_broj = sheet["E12"].value
-        sifra_aparata = sheet["B13"].value
-        verzija_sw = sheet["E13"].value
-        sifra_pogreske = sheet["A16"].value
-        opis_pogreske = sheet["B16"].value
-        opis_obavljenog_posla = sheet["A19"].value
-        serviser = sheet["A35"].value
-        datum = sheet["E6"].value
-
-        # Extract checkbox data
-        checkbox_labels = [sheet[f"{col}1"].value for col in "ABCDEF"]
-        checkbox_values = [sheet[f"{col}2"].value for col in "ABCDEF"]
-        checked_items = [label for label, value in zip(checkbox_labels, checkbox_values) if value]
-
-        # --- Extract Potrošni materijal (Consumables) ---
-        consumables_list = []
-        for row in range(27, 32):  # A27 to I31
-            # Since B-F is merged, the value is in B
-            opis = sheet[f"B{row}"].value
-            if opis:  # Only process if there's a description
-                kataloski_broj = sheet[f"A{row}"].value
-                lot = sheet[f"G{row}"].value
-                kolicina = sheet[f"H{row}"].value
-                dostavnica = sheet[f"I{row}"].value
-
-                # Format into a descriptive string
-                consumable_str = (
-                    f"{kataloski_broj or ''} | {opis or ''} | "
-                    f"LOT: {lot or 'None'} | Količina: {kolicina or 'None'} | "
-                    f"Dostavnica: {dostavnica or 'None'}"
-                )
-                consumables_list.append(consumable_str)
-
-        potrosni_materijal = "\n".join(consumables_list)
-
-        return {
-            "work_order_number": work_order_number,
-            "partner": partner,
-            "aparat": aparat,
-            "serijski_broj": serijski_broj,
-            "sifra_aparata": sifra_aparata,
-            "verzija_sw": verzija_sw,
-            "sifra_pogreske": sifra_pogreske,
-            "opis_pogreske": opis_pogreske,
-            "opis_obavljenog_posla": opis_obavljenog_posla,
-            "serviser": serviser,
-            "datum": datum,
-            "potrosni_materijal": potrosni_materijal,
-            "checked_items": checked_items,
-            "izvorna_datoteka": str(file_path),
-        }
+        return extract_work_order(workbook, file_path)
 
     except FileNotFoundError:
         logging.error(f"Error: The file at {file_path} was not found.")
@@ -146,6 +91,69 @@ def parse_excel(file_path):
         return None
 
 
+def extract_work_order(workbook, file_path):
+    """
+    Extracts the work order data from an already loaded workbook.
+    """
+    sheet = workbook.active
+
+    # Extract all the required data
+    work_order_number = sheet["C6"].value
+    partner = sheet["B7"].value
+    aparat = sheet["B12"].value
+    serijski_broj = sheet["E12"].value
+    sifra_aparata = sheet["B13"].value
+    verzija_sw = sheet["E13"].value
+    sifra_pogreske = sheet["A16"].value
+    opis_pogreske = sheet["B16"].value
+    opis_obavljenog_posla = sheet["A19"].value
+    serviser = sheet["A35"].value
+    datum = sheet["E6"].value
+
+    # Extract checkbox data
+    checkbox_labels = [sheet[f"{col}1"].value for col in "ABCDEF"]
+    checkbox_values = [sheet[f"{col}2"].value for col in "ABCDEF"]
+    checked_items = [label for label, value in zip(checkbox_labels, checkbox_values) if value]
+
+    # --- Extract Potrošni materijal (Consumables) ---
+    consumables_list = []
+    for row in range(27, 32):  # A27 to I31
+        # Since B-F is merged, the value is in B
+        opis = sheet[f"B{row}"].value
+        if opis:  # Only process if there's a description
+            kataloski_broj = sheet[f"A{row}"].value
+            lot = sheet[f"G{row}"].value
+            kolicina = sheet[f"H{row}"].value
+            dostavnica = sheet[f"I{row}"].value
+
+            # Format into a descriptive string
+            consumable_str = (
+                f"{kataloski_broj or ''} | {opis or ''} | "
+                f"LOT: {lot or 'None'} | Količina: {kolicina or 'None'} | "
+                f"Dostavnica: {dostavnica or 'None'}"
+            )
+            consumables_list.append(consumable_str)
+
+    potrosni_materijal = "\n".join(consumables_list)
+
+    return {
+        "work_order_number": work_order_number,
+        "partner": partner,
+        "aparat": aparat,
+        "serijski_broj": serijski_broj,
+        "sifra_aparata": sifra_aparata,
+        "verzija_sw": verzija_sw,
+        "sifra_pogreske": sifra_pogreske,
+        "opis_pogreske": opis_pogreske,
+        "opis_obavljenog_posla": opis_obavljenog_posla,
+        "serviser": serviser,
+        "datum": datum,
+        "potrosni_materijal": potrosni_materijal,
+        "checked_items": checked_items,
+        "izvorna_datoteka": str(file_path),
+    }
+
+
 def generate_details_html(data, output_path="work_order_details.html"):
     """
     Generates an HTML file with the work order details.
@@ -177,6 +185,19 @@ def generate_details_html(data, output_path="work_order_details.html"):
     logging.info(f"Generated {output_path}")
 
 
+def prepare_upload_files(excel_data):
+    """
+    Writes temp_number.txt and work_order_details.html and returns the FTP upload list.
+    """
+    save_temp_number(excel_data["work_order_number"], excel_data["datum"])
+    generate_details_html(excel_data)
+
+    return [
+        {"local_path": Path("temp_number.txt"), "remote_name": "data.txt"},
+        {"local_path": Path("work_order_details.html"), "remote_name": "work_order_details.html"}
+    ]
+
+
 def process_file(file_path, ftp_config, bot_token, chat_id, watched_folder):
     try:
         excel_data = parse_excel(file_path)
@@ -228,13 +249,7 @@ def process_file(file_path, ftp_config, bot_token, chat_id, watched_folder):
 
         # Proceed if confirmed
         logging.info("User confirmed, proceeding with file upload.")
-        save_temp_number(radni_nalog, datum)
-        generate_details_html(excel_data)
-
-        files_to_upload = [
-            {"local_path": Path("temp_number.txt"), "remote_name": "data.txt"},
-            {"local_path": Path("work_order_details.html"), "remote_name": "work_order_details.html"}
-        ]
+        files_to_upload = prepare_upload_files(excel_data)
 
         upload_files_to_ftp(ftp_config, files_to_upload)
 
@@ -242,6 +257,7 @@ def process_file(file_path, ftp_config, bot_token, chat_id, watched_folder):
         log_to_csv(excel_data, watched_folder)
         log_to_excel(excel_data, watched_folder)
         # send_success_message(file_path, radni_nalog, datum, bot_token, chat_id)
+        return True
 
     except Exception as e:
         logging.exception("Error processing file %s: %s", file_path, e)
@@ -0,0 +1,327 @@
+# =======================
+# File: replay.py
+# =======================
+"""
+Replay a recorded trace (see trace_recorder.py) against a local FTP stand-in.
+
+Re-creates the recorded files in a temp folder at 1x or accelerated speed, runs a
+WatchService over it and reports queue depth over time, end-to-end latency per
+file and the final FTP state.
+
+Usage:
+    python replay.py <trace_dir> [--speed 10] [--max-workers 4] [--engine asyncio] [--json report.json]
+"""
+import argparse
+import json
+import logging
+import os
+import shutil
+import socket
+import socketserver
+import statistics
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from trace_recorder import load_trace
+
+# Files the service writes into the watched folder itself; replaying them would double count.
+SKIP_PREFIXES = ("~", "Lista radni nalozi")
+
+
+# --- FTP stand-in ---
+
+class _FTPHandler(socketserver.StreamRequestHandler):
+    """Just enough of RFC 959 for ftplib's login/cwd/retrlines/storbinary/quit."""
+
+    def reply(self, text):
+        self.wfile.write((text + "\r\n").encode("utf-8"))
+
+    def handle(self):
+        self.pasv = None
+        self.reply("220 rnals FTP stand-in")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                break
+            cmd, _, arg = line.decode("utf-8").strip().partition(" ")
+            cmd = cmd.upper()
+            if cmd == "USER":
+                self.reply("331 Password required")
+            elif cmd == "PASS":
+                self.reply("230 Logged in")
+            elif cmd in ("TYPE", "NOOP"):
+                self.reply("200 OK")
+            elif cmd == "CWD":
+                self.reply("250 OK")
+            elif cmd == "PWD":
+                self.reply('257 "/"')
+            elif cmd == "PASV":
+                self.open_pasv()
+            elif cmd == "RETR":
+                self.retr(arg)
+            elif cmd == "STOR":
+                self.stor(arg)
+            elif cmd == "QUIT":
+                self.reply("221 Bye")
+                break
+            else:
+                self.reply("502 Not implemented")
+
+    def open_pasv(self):
+        self.pasv = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.pasv.bind(("127.0.0.1", 0))
+        self.pasv.listen(1)
+        port = self.pasv.getsockname()[1]
+        self.reply(f"227 Entering Passive Mode (127,0,0,1,{port >> 8},{port & 0xFF}).")
+
+    def accept_data(self):
+        if self.pasv is None:
+            self.reply("425 Use PASV first")
+            return None
+        conn, _ = self.pasv.accept()
+        self.pasv.close()
+        self.pasv = None
+        return conn
+
+    def retr(self, name):
+        content = self.server.files.get(name)
+        if content is None:
+            if self.pasv is not None:
+                self.pasv.close()
+                self.pasv = None
+            self.reply("550 No such file")
+            return
+        self.reply("150 Opening data connection")
+        conn = self.accept_data()
+        if conn is None:
+            return
+        with conn:
+            conn.sendall(content)
+        self.reply("226 Transfer complete")
+
+    def stor(self, name):
+        self.reply("150 Opening data connection")
+        conn = self.accept_data()
+        if conn is None:
+            return
+        chunks = []
+        with conn:
+            while True:
+                chunk = conn.recv(65536)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+        content = b"".join(chunks)
+        with self.server.lock:
+            self.server.files[name] = content
+            self.server.stores.append({"ts": time.time(), "name": name, "size": len(content)})
+        self.reply("226 Transfer complete")
+
+
+class FTPStandIn(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = 128
+
+    def __init__(self, initial_files=None):
+        super().__init__(("127.0.0.1", 0), _FTPHandler)
+        self.files = dict(initial_files or {})
+        self.stores = []
+        self.lock = threading.Lock()
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+# --- Replay ---
+
+def build_schedule(records):
+    """Return [(offset_seconds, folder_idx, rel_path, snapshot)] for each recorded file."""
+    snapshots = {}
+    for rec in records:
+        if rec["kind"] == "job" and rec["event"] == "finished" and rec.get("snapshot"):
+            snapshots.setdefault((rec["folder"], rec["path"]), rec["snapshot"])
+
+    schedule = []
+    seen = set()
+    for rec in records:
+        if rec["kind"] != "fs" or rec["event"] != "created" or rec["is_directory"]:
+            continue
+        # folder is None when the path lay outside every watched folder; its path is then
+        # absolute and would point replay at the original location
+        if rec["folder"] is None:
+            continue
+        key = (rec["folder"], rec["path"])
+        if key in seen or key not in snapshots:
+            continue
+        if os.path.basename(rec["path"]).startswith(SKIP_PREFIXES):
+            continue
+        seen.add(key)
+        schedule.append((rec["ts"], rec["folder"], rec["path"], snapshots[key]))
+
+    if not schedule:
+        return []
+    t0 = schedule[0][0]
+    return [(ts - t0, folder, path, snap) for ts, folder, path, snap in schedule]
+
+
+def summarize(values):
+    if not values:
+        return {}
+    ordered = sorted(values)
+    return {
+        "count": len(ordered),
+        "min": ordered[0],
+        "median": statistics.median(ordered),
+        "p95": ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))],
+        "max": ordered[-1],
+    }
+
+
+def replay(trace_dir, speed=1.0, max_workers=4, engine="threads", settle=2.0, initial_number="0000/2025"):
+    trace_dir = Path(trace_dir).resolve()
+    schedule = build_schedule(load_trace(trace_dir))
+    if not schedule:
+        raise ValueError(f"No replayable files in trace {trace_dir}")
+
+    work_dir = Path(tempfile.mkdtemp(prefix="rnals_replay_"))
+    folder_count = max(folder for _, folder, _, _ in schedule) + 1
+    folders = [work_dir / f"folder_{i}" for i in range(folder_count)]
+    for folder in folders:
+        folder.mkdir()
+
+    ftp = FTPStandIn({"data.txt": (initial_number + "\n").encode("utf-8")}).start()
+    ftp_config = dict(host="127.0.0.1", port=ftp.port, user="replay", passwd="replay",
+                      remote_dir="", remote_file="data.txt")
+
+    # processor writes temp_number.txt / work_order_details.html / logs relative to cwd
+    old_cwd = os.getcwd()
+    os.chdir(work_dir)
+    try:
+        from watcher import WatchService
+
+        replay_trace = work_dir / "trace"
+        svc = WatchService(
+            folders_to_watch=[str(f) for f in folders],
+            bot_token=None,
+            chat_id=None,
+            ftp_config=ftp_config,
+            max_workers=max_workers,
+            trace_dir=replay_trace,
+            trace_snapshots=False,
+            engine=engine,
+        )
+        svc.start_observers()
+
+        written = {}
+        start = time.time()
+        for offset, folder, rel, snapshot in schedule:
+            delay = start + offset / speed - time.time()
+            if delay > 0:
+                time.sleep(delay)
+            target = folders[folder] / rel
+            target.parent.mkdir(parents=True, exist_ok=True)
+            # latency starts when the file appears, like the recorded created event
+            written[(folder, rel)] = time.time()
+            shutil.copyfile(trace_dir / snapshot, target)
+        logging.info("Replayed %d files in %.2fs", len(schedule), time.time() - start)
+
+        # give the observers time to deliver the last events, then drain the pool
+        time.sleep(settle)
+        svc.stop()
+    finally:
+        os.chdir(old_cwd)
+        ftp.stop()
+
+    records = load_trace(replay_trace)
+    queue_depth = [
+        {"t": rec["ts"] - start, "queued": rec["queued"], "running": rec["running"]}
+        for rec in records if rec["kind"] == "job"
+    ]
+    # failed jobs finish early; keeping them out of the latency stats stops a change that
+    # makes more jobs fail from looking faster
+    latencies = {}
+    failed = []
+    for rec in records:
+        if rec["kind"] == "job" and rec["event"] == "finished":
+            key = (rec["folder"], rec["path"])
+            if key not in written:
+                continue
+            if rec["ok"]:
+                latencies[rec["path"]] = rec["ts"] - written[key]
+            else:
+                failed.append(rec["path"])
+
+    return {
+        "trace": str(trace_dir),
+        "work_dir": str(work_dir),
+        "speed": speed,
+        "max_workers": max_workers,
+        "engine": engine,
+        "files_replayed": len(schedule),
+        "files_processed": len(latencies),
+        "files_failed": failed,
+        "queue_depth": queue_depth,
+        "max_queued": max((q["queued"] for q in queue_depth), default=0),
+        "latency": latencies,
+        "latency_summary": summarize(list(latencies.values())),
+        "ftp": {
+            "files": {name: content.decode("utf-8", "replace") if name.endswith(".txt") else len(content)
+                      for name, content in ftp.files.items()},
+            "stores": len(ftp.stores),
+        },
+    }
+
+
+def print_report(report):
+    print(f"Trace: {report['trace']}  (speed {report['speed']}x, engine {report['engine']}, max_workers {report['max_workers']})")
+    print(f"Files replayed: {report['files_replayed']}, processed: {report['files_processed']}, "
+          f"failed: {len(report['files_failed'])}")
+    print(f"Max queue depth: {report['max_queued']}")
+    print("\nQueue depth over time:")
+    for q in report["queue_depth"]:
+        print(f"  {q['t']:8.2f}s  queued={q['queued']:3d}  running={q['running']:3d}")
+    print("\nEnd-to-end latency per file:")
+    for path, latency in sorted(report["latency"].items(), key=lambda kv: kv[1]):
+        print(f"  {latency:8.2f}s  {path}")
+    summary = report["latency_summary"]
+    if summary:
+        print("  min {min:.2f}s  median {median:.2f}s  p95 {p95:.2f}s  max {max:.2f}s".format(**summary))
+    if report["files_failed"]:
+        print("\nFailed files (not in latency stats):")
+        for path in sorted(report["files_failed"]):
+            print(f"  {path}")
+    print(f"\nFinal FTP state ({report['ftp']['stores']} uploads):")
+    for name, value in sorted(report["ftp"]["files"].items()):
+        print(f"  {name}: {value!r}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay a recorded watcher trace.")
+    parser.add_argument("trace_dir")
+    parser.add_argument("--speed", type=float, default=1.0, help="time acceleration factor (1 = real time)")
+    parser.add_argument("--max-workers", type=int, default=4)
+    parser.add_argument("--engine", choices=("threads", "asyncio"), default="threads")
+    parser.add_argument("--settle", type=float, default=2.0, help="seconds to wait after the last file")
+    parser.add_argument("--json", help="also write the full report to this file")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    report = replay(args.trace_dir, speed=args.speed, max_workers=args.max_workers, engine=args.engine,
+                    settle=args.settle)
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=4, ensure_ascii=False)
@@ -0,0 +1,129 @@
+# =======================
+# File: trace_recorder.py
+# =======================
+"""
+Trace recorder: logs timestamped filesystem events and job lifecycle to a JSONL file,
+and snapshots every processed xlsx so replay.py can re-create the burst later.
+
+Trace layout:
+    <trace_dir>/events.jsonl   one JSON object per line
+    <trace_dir>/files/         copies of the xlsx files as the worker saw them
+"""
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+
+EVENTS_FILE = "events.jsonl"
+FILES_DIR = "files"
+
+
+class TraceRecorder:
+    def __init__(self, trace_dir, folders, snapshot=True):
+        self.trace_dir = Path(trace_dir)
+        self.files_dir = self.trace_dir / FILES_DIR
+        # replay.py turns snapshots off so the copy doesn't add to the latency it measures
+        self.snapshot = snapshot
+        self.trace_dir.mkdir(parents=True, exist_ok=True)
+        if snapshot:
+            self.files_dir.mkdir(exist_ok=True)
+        self.folders = [os.path.abspath(f) for f in folders]
+        self._lock = threading.Lock()
+        self._seq = 0
+        self._queued = 0
+        self._running = 0
+        self._fh = (self.trace_dir / EVENTS_FILE).open("a", encoding="utf-8")
+        logging.info("Recording trace to %s", self.trace_dir)
+
+    def _locate(self, path):
+        """Return (folder index, path relative to that folder)."""
+        path = os.path.abspath(path)
+        for idx, folder in enumerate(self.folders):
+            if path == folder or path.startswith(folder + os.sep):
+                return idx, os.path.relpath(path, folder)
+        return None, path
+
+    def _write(self, record):
+        # caller holds self._lock
+        record["ts"] = time.time()
+        self._fh.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._fh.flush()
+
+    def fs_event(self, event):
+        folder_idx, rel = self._locate(event.src_path)
+        record = {
+            "kind": "fs",
+            "event": event.event_type,
+            "folder": folder_idx,
+            "path": rel,
+            "is_directory": event.is_directory,
+        }
+        dest = getattr(event, "dest_path", None)
+        if dest:
+            record["dest_path"] = self._locate(dest)[1]
+        with self._lock:
+            self._write(record)
+
+    def job_queued(self, path):
+        folder_idx, rel = self._locate(path)
+        with self._lock:
+            self._queued += 1
+            self._write({"kind": "job", "event": "queued", "folder": folder_idx, "path": rel,
+                         "queued": self._queued, "running": self._running})
+
+    def _snapshot(self, path):
+        with self._lock:
+            self._seq += 1
+            seq = self._seq
+        target = self.files_dir / f"{seq:05d}_{os.path.basename(path)}"
+        try:
+            shutil.copy2(path, target)
+        except OSError as e:
+            logging.warning("Trace snapshot of %s failed: %s", path, e)
+            return None
+        return f"{FILES_DIR}/{target.name}"
+
+    def job_started(self, path):
+        folder_idx, rel = self._locate(path)
+        with self._lock:
+            self._queued -= 1
+            self._running += 1
+            self._write({"kind": "job", "event": "started", "folder": folder_idx, "path": rel,
+                         "queued": self._queued, "running": self._running})
+
+    def job_finished(self, path, ok):
+        # snapshot after the job: the created event can fire while the file is still being copied
+        snapshot = self._snapshot(path) if self.snapshot else None
+        folder_idx, rel = self._locate(path)
+        with self._lock:
+            self._running -= 1
+            self._write({"kind": "job", "event": "finished", "folder": folder_idx, "path": rel,
+                         "ok": ok, "snapshot": snapshot, "queued": self._queued, "running": self._running})
+
+    def wrap(self, func):
+        """
+        Wrap a job callable so its start/finish land in the trace. Jobs catch their own
+        errors, so a truthy return value is what marks the job as successful.
+        """
+        def run(file_path, *args, **kwargs):
+            self.job_started(file_path)
+            ok = False
+            try:
+                result = func(file_path, *args, **kwargs)
+                ok = bool(result)
+                return result
+            finally:
+                self.job_finished(file_path, ok)
+        return run
+
+    def close(self):
+        with self._lock:
+            self._fh.close()
+
+
+def load_trace(trace_dir):
+    with (Path(trace_dir) / EVENTS_FILE).open("r", encoding="utf-8") as fh:
+        return [json.loads(line) for line in fh if line.strip()]
@@ -7,22 +7,43 @@ Watcher service: sets up watchdog observers and a thread pool for processing fil
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 from concurrent.futures import ThreadPoolExecutor
+import threading
 import time
 import logging
 import os
-from processor import process_file
-
+from trace_recorder import TraceRecorder
+
+# processor itself is light (openpyxl is lazy inside it), but it brings in ftp_utils ->
+# ftplib + asyncio, roughly 20 ms. Importing it lazily lets the observers start first;
+# start_observers then preloads processor and openpyxl in the background.
+
+def process_file(file_path, **job_kwargs):
+    import processor
+    return processor.process_file(file_path, **job_kwargs)
+
+def preload_dependencies():
+    start = time.perf_counter()
+    import openpyxl
+    import processor
+    logging.info("Processing dependencies loaded in %.0f ms", (time.perf_counter() - start) * 1000)
+
 class ExcelCreatedHandler(FileSystemEventHandler):
-    def __init__(self, folder, executor, ftp_config, bot_token, chat_id):
+    def __init__(self, folder, executor, ftp_config, bot_token, chat_id, recorder=None, engine=None):
         self.folder = folder
         self.executor = executor
+        self.engine = engine
         self.ftp_config = ftp_config
         self.bot_token = bot_token
         self.chat_id = chat_id
-
+        self.recorder = recorder
+
+    def on_any_event(self, event):
+        if self.recorder:
+            self.recorder.fs_event(event)
+
     def on_created(self, event):
         if event.is_directory:
-            return
+            return
 
         # --- Ignore temporary and log files ---
         file_name = os.path.basename(event.src_path)
@@ -31,38 +52,83 @@ class ExcelCreatedHandler(FileSystemEventHandler):
 
         if event.src_path.lower().endswith(".xlsx"):
             logging.info("New xlsx detected: %s", event.src_path)
+            if self.recorder:
+                self.recorder.job_queued(event.src_path)
+            if self.engine:
+                self.engine.submit(event.src_path,
+                                   ftp_config=self.ftp_config,
+                                   bot_token=self.bot_token,
+                                   chat_id=self.chat_id,
+                                   watched_folder=self.folder)
+                return
+            job = process_file
+            if self.recorder:
+                job = self.recorder.wrap(process_file)
             # submit for background processing
-            self.executor.submit(process_file,
+            self.executor.submit(job,
                                  event.src_path,
                                  ftp_config=self.ftp_config,
                                  bot_token=self.bot_token,
                                  chat_id=self.chat_id,
                                  watched_folder=self.folder)
-
+
 class WatchService:
-    def __init__(self, folders_to_watch, bot_token, chat_id, ftp_config, max_workers=4):
+    def __init__(self, folders_to_watch, bot_token, chat_id, ftp_config, max_workers=4, trace_dir=None,
+                 engine="threads", ftp_connections=8, trace_snapshots=True):
         self.folders = folders_to_watch
         self.bot_token = bot_token
         self.chat_id = chat_id
         self.ftp_config = ftp_config
         self.observers = []
-        self.executor = ThreadPoolExecutor(max_workers=max_workers)
-
-    def start(self):
+        # recorder mode: log events and snapshot files for replay.py
+        self.recorder = TraceRecorder(trace_dir, folders_to_watch, snapshot=trace_snapshots) if trace_dir else None
+        # engine="asyncio": jobs run as tasks on one event loop, max_workers only sizes the parsing executor
+        if engine == "asyncio":
+            from async_engine import AsyncEngine
+            self.executor = None
+            self.engine = AsyncEngine(cpu_workers=max_workers, ftp_connections=ftp_connections,
+                                      recorder=self.recorder)
+        elif engine == "threads":
+            self.executor = ThreadPoolExecutor(max_workers=max_workers)
+            self.engine = None
+        else:
+            raise ValueError(f"Unknown engine: {engine}")
+
+    def start_observers(self):
         for folder in self.folders:
-            handler = ExcelCreatedHandler(folder, self.executor, self.ftp_config, self.bot_token, self.chat_id)
+            handler = ExcelCreatedHandler(folder, self.executor, self.ftp_config, self.bot_token, self.chat_id,
+                                          recorder=self.recorder, engine=self.engine)
             obs = Observer()
             obs.schedule(handler, folder, recursive=True)
             obs.start()
             self.observers.append(obs)
             logging.info("Started watching %s", folder)
+        # after the observers: the engine buffers submits until its loop is up
+        if self.engine:
+            self.engine.start()
+        threading.Thread(target=preload_dependencies, name="rnals-preload", daemon=True).start()
+
+    def stop(self):
+        for obs in self.observers:
+            obs.stop()
+        for obs in self.observers:
+            obs.join()
+        if self.engine:
+            self.engine.stop()
+        else:
+            self.executor.shutdown(wait=True)
+        if self.recorder:
+            self.recorder.close()
+        logging.info("Shutdown complete.")
+
+    def start(self):
+        self.start_observers()
+        self.serve()
+
+    def serve(self):
+        """Block until KeyboardInterrupt, then shut down."""
         try:
             while True:
                 time.sleep(1)
         except KeyboardInterrupt:
-            for obs in self.observers:
-                obs.stop()
-            for obs in self.observers:
-                obs.join()
-            self.executor.shutdown(wait=True)
-            logging.info("Shutdown complete.")
\ No newline at end of file
+            self.stop()